@@ -1,10 +1,18 @@
+import math
+import os
+import time
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sha256 import sha256_trace
+from sha256 import sha256
+from trace_store import TraceStore, deep_sizeof
+from batch_stats import BatchStats, hash_batch
 import plotly.graph_objects as go
 from streamlit_autorefresh import st_autorefresh
 
+# Début de la mesure de latence du rerun
+rerun_start = time.perf_counter()
+
 # Configuration de la page
 st.set_page_config(
     page_title="SHA-256 — Démo pas-à-pas",
@@ -13,9 +21,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Store de traces partagé entre toutes les sessions (une seule copie par message)
+@st.cache_resource
+def get_trace_store() -> TraceStore:
+    return TraceStore(max_entries=32)
+
+store = get_trace_store()
+
 # Initialisation des variables de session
-if 'trace' not in st.session_state:
-    st.session_state.trace = None
+# La session ne garde que le digest : trace et frames sont lues dans le store partagé
+if 'trace_digest' not in st.session_state:
+    st.session_state.trace_digest = None
 if 'current_block' not in st.session_state:
     st.session_state.current_block = 0
 if 'current_round' not in st.session_state:
@@ -30,10 +46,29 @@ if 'play_speed' not in st.session_state:
     st.session_state.play_speed = 0.5  # Vitesse en secondes entre chaque round
 if 'refresh_count' not in st.session_state:
     st.session_state.refresh_count = 0
+if 'rerun_ms' not in st.session_state:
+    st.session_state.rerun_ms = 0.0
+if 'batch_summary' not in st.session_state:
+    st.session_state.batch_summary = None
+
+trace, frames = None, None
+trace_evicted = False
+if st.session_state.trace_digest:
+    entry = store.get(st.session_state.trace_digest)
+    if entry is not None:
+        trace, frames = entry
+    else:
+        # Trace évincée du store partagé : l'utilisateur doit relancer le hachage
+        st.session_state.trace_digest = None
+        st.session_state.auto_play = False
+        trace_evicted = True
 
 # Titre principal
 st.title("🔐 SHA-256 — Démo pas-à-pas")
 
+if trace_evicted:
+    st.info("La trace de votre message a expiré du cache partagé : cliquez à nouveau sur « Hacher » pour la recalculer.")
+
 # Sidebar pour les contrôles
 with st.sidebar:
     st.header("⚙️ Contrôles")
@@ -56,11 +91,13 @@ with st.sidebar:
         **Rounds** : 64 rounds de compression avec mise à jour des registres a..h
         
         **Comparaison** : Visualisation bit à bit des différences entre deux hash
+        
+        **Lot** : Statistiques sur les hash de toutes les lignes d'un fichier
         """)
 
 
 # Onglets principaux
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Message", "📊 Padding", "📋 Schedule", "🔄 Rounds", "🔍 Comparaison"])
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📝 Message", "📊 Padding", "📋 Schedule", "🔄 Rounds", "🔍 Comparaison", "📦 Lot"])
 
 # ===== ONGLET 1: MESSAGE ET HASH =====
 with tab1:
@@ -97,8 +134,8 @@ with tab1:
         if st.button("🔐 Hacher", type="primary"):
             if message_input.strip():
                 try:
-                    result = sha256_trace(message_input.encode())
-                    st.session_state.trace = result
+                    digest, trace, frames = store.put(message_input.encode())
+                    st.session_state.trace_digest = digest
                     st.session_state.current_block = 0
                     st.session_state.current_round = 0
                     st.success("Hash calculé avec succès!")
@@ -108,20 +145,20 @@ with tab1:
                 st.warning("Le message ne peut pas être vide")
 
     # Affichage du digest
-    if st.session_state.trace:
+    if trace:
         st.markdown("### Digest (hex)")
-        st.code(st.session_state.trace['digest'], language=None)
+        st.code(trace['digest'], language=None)
 
 # ===== ONGLET 2: PADDING =====
 with tab2:
     st.header("Informations de Padding")
 
-    if st.session_state.trace:
+    if trace:
         # Affichage du digest
         st.markdown("### Digest (hex)")
-        st.code(st.session_state.trace['digest'], language=None)
+        st.code(trace['digest'], language=None)
         st.markdown("---")
-        padding_info = st.session_state.trace['padding']
+        padding_info = trace['padding']
 
         col1, col2 = st.columns(2)
         with col1:
@@ -131,7 +168,7 @@ with tab2:
         with col2:
             st.metric("Champ longueur (64 bits)", padding_info['len_bits'])
             st.metric("Total après padding (bits)", padding_info['total_bits'])
-            st.metric("Nombre de blocs (512b)", len(st.session_state.trace['blocks']))
+            st.metric("Nombre de blocs (512b)", len(trace['blocks']))
     else:
         st.info("Hachez d'abord un message pour voir les informations de padding")
 
@@ -139,10 +176,10 @@ with tab2:
 with tab3:
     st.header("Schedule W[0..63]")
 
-    if st.session_state.trace and st.session_state.trace['blocks']:
+    if trace and trace['blocks']:
         # Affichage du digest
         st.markdown("### Digest (hex)")
-        st.code(st.session_state.trace['digest'], language=None)
+        st.code(trace['digest'], language=None)
         st.markdown("---")
 
         # Encadré d'explication
@@ -166,7 +203,7 @@ with tab3:
         # Contrôles de navigation
         col1, col2, col3 = st.columns([2, 2, 6])
         with col1:
-            max_block = len(st.session_state.trace['blocks']) - 1
+            max_block = len(trace['blocks']) - 1
             # Ne pas écraser current_block si en mode Play
             if not st.session_state.auto_play:
                 new_block = st.number_input(
@@ -210,22 +247,21 @@ with tab3:
                 )
 
         # Affichage du schedule
-        block = st.session_state.trace['blocks'][st.session_state.current_block]
-        schedule = block['schedule']
+        block = trace['blocks'][st.session_state.current_block]
 
-        # Créer un DataFrame pour l'affichage
+        # Créer un DataFrame pour l'affichage (chaînes hex pré-calculées dans le store)
         df_schedule = pd.DataFrame({
             'i': range(64),
-            'W[i]': [f"0x{w:08x}" for w in schedule]
+            'W[i]': block['schedule_hex']
         })
 
-        # Mettre en évidence le round actuel
-        def highlight_row(row):
-            if row.name == st.session_state.current_round:
-                return ['background-color: #4776e6; color: white'] * len(row)
-            return [''] * len(row)
-
-        styled_df = df_schedule.style.apply(highlight_row, axis=1)
+        # Mettre en évidence le round actuel (une seule ligne stylée, pas de parcours du tableau)
+        styled_df = df_schedule.style
+        if st.session_state.current_round < 64:
+            styled_df = styled_df.set_properties(
+                subset=pd.IndexSlice[[st.session_state.current_round], :],
+                **{'background-color': '#4776e6', 'color': 'white'}
+            )
         st.dataframe(styled_df, height=600, use_container_width=True)
     else:
         st.info("Hachez d'abord un message pour voir le schedule")
@@ -234,13 +270,13 @@ with tab3:
 with tab4:
     st.header("Rounds de compression (0..63)")
 
-    if st.session_state.trace and st.session_state.trace['blocks']:
+    if trace and trace['blocks']:
         # Affichage du digest final
         st.markdown("### Hash SHA-256 final")
-        st.code(st.session_state.trace['digest'], language=None)
+        st.code(trace['digest'], language=None)
 
-        # Calculer et afficher le hash intermédiaire (concaténation des registres du round actuel)
-        # On doit le faire après avoir récupéré round_info, donc on le fera plus bas
+        # Le hash intermédiaire (concaténation des registres du round actuel)
+        # est affiché plus bas, une fois la frame du round récupérée
 
         st.markdown("---")
         # Contrôles de navigation
@@ -326,7 +362,7 @@ with tab4:
                     st.session_state.current_round += 1
                 else:
                     # Passer au bloc suivant si disponible
-                    if st.session_state.current_block < len(st.session_state.trace['blocks']) - 1:
+                    if st.session_state.current_block < len(trace['blocks']) - 1:
                         st.session_state.current_block += 1
                         st.session_state.current_round = 0
                     else:
@@ -336,11 +372,11 @@ with tab4:
 
 
         # Récupérer les informations du round
-        block = st.session_state.trace['blocks'][st.session_state.current_block]
-        round_info = block['rounds'][st.session_state.current_round]
+        # Frame pré-calculée : toutes les chaînes du round sont déjà formatées
+        frame = frames[st.session_state.current_block][st.session_state.current_round]
 
         # Afficher le hash intermédiaire (concaténation des registres a..h)
-        intermediate_hash = ''.join(f"{round_info[reg]:08x}" for reg in "abcdefgh")
+        intermediate_hash = frame['hash']
 
         # Affichage différent selon le round
         if st.session_state.current_round == 64:
@@ -364,7 +400,7 @@ with tab4:
             # Afficher le round actuel (0-based, donc on affiche +1 pour l'utilisateur)
             # Mais on ne dépasse jamais total_rounds dans l'affichage
             display_round = min(st.session_state.current_round + 1, total_rounds)
-            st.info(f"▶ Lecture en cours... Bloc {st.session_state.current_block + 1}/{len(st.session_state.trace['blocks'])} - Round {display_round}/{total_rounds}")
+            st.info(f"▶ Lecture en cours... Bloc {st.session_state.current_block + 1}/{len(trace['blocks'])} - Round {display_round}/{total_rounds}")
 
             # Calcul de la progression avec protection contre les dépassements
             # round_idx est 0-based (0 à 63 pour les rounds normaux, 64 pour l'état final)
@@ -397,7 +433,7 @@ with tab4:
         cols = st.columns(8)
         for i, reg in enumerate("abcdefgh"):
             with cols[i]:
-                st.metric(reg.upper(), f"0x{round_info[reg]:08x}")
+                st.metric(reg.upper(), frame[reg])
 
         st.markdown("---")
 
@@ -406,13 +442,13 @@ with tab4:
             st.markdown("### Variables de round")
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("T1", f"0x{round_info['T1']:08x}")
+                st.metric("T1", frame['T1'])
             with col2:
-                st.metric("T2", f"0x{round_info['T2']:08x}")
+                st.metric("T2", frame['T2'])
             with col3:
-                st.metric("K", f"0x{round_info['K']:08x}")
+                st.metric("K", frame['K'])
             with col4:
-                st.metric("W", f"0x{round_info['W']:08x}")
+                st.metric("W", frame['W'])
 
             # Formules LaTeX pour T1 et T2
             st.markdown("")
@@ -429,13 +465,13 @@ with tab4:
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.markdown("**Ch(e,f,g)**")
-                st.code(f"0x{round_info['Ch']:08x}")
+                st.code(frame['Ch'])
             with col2:
                 st.markdown("**Σ1(e)**")
-                st.code(f"0x{round_info['Sigma1']:08x}")
+                st.code(frame['Sigma1'])
             with col3:
                 st.markdown("**Maj(a,b,c)**")
-                st.code(f"0x{round_info['Maj']:08x}")
+                st.code(frame['Maj'])
         else:
             st.info("Round 64 : État final après addition. Aucune opération n'est effectuée à cette étape.")
 
@@ -455,11 +491,9 @@ with tab5:
     if st.button("🔍 Comparer", type="primary"):
         if msg1.strip() and msg2.strip():
             try:
-                hash1_result = sha256_trace(msg1.encode())
-                hash2_result = sha256_trace(msg2.encode())
-
-                st.session_state.hash1 = hash1_result['digest']
-                st.session_state.hash2 = hash2_result['digest']
+                # Seuls les digests sont utiles ici : pas besoin de la trace complète
+                st.session_state.hash1 = sha256(msg1.encode()).hex()
+                st.session_state.hash2 = sha256(msg2.encode()).hex()
 
                 st.success("Comparaison effectuée!")
             except Exception as e:
@@ -537,3 +571,103 @@ with tab5:
         with legend_cols[2]:
             st.markdown("🟥 **Bits différents**")
 
+
+# ===== ONGLET 6: LOT =====
+def render_batch_summary(summary, key):
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Messages", summary['count'])
+    with col2:
+        st.metric("Biais max par bit", f"{summary['max_abs_bias'] * 100:.2f}%")
+    with col3:
+        st.metric("Distance de Hamming moyenne", f"{summary['hamming_mean']:.2f} / 256")
+    with col4:
+        st.metric(
+            f"Paires en collision sur {summary['prefix_bits']} bits",
+            summary['prefix_collisions'],
+            help=f"Attendu (anniversaires) : {summary['expected_collisions']:.2f} — lignes identiques ignorées : {summary['duplicates']}"
+        )
+
+    col_bias, col_hist = st.columns(2)
+    with col_bias:
+        # Fréquence des 1 moins 0.5 pour chaque bit, même grille 8x32 que la comparaison
+        fig = go.Figure(data=go.Heatmap(
+            z=summary['bit_bias'].reshape(8, 32),
+            colorscale='RdBu',
+            zmid=0,
+            hovertemplate='Bit %{x},%{y} : %{z:.4f}<extra></extra>'
+        ))
+        fig.update_layout(title="Biais par bit (fréquence des 1 − 0.5)", height=400)
+        st.plotly_chart(fig, use_container_width=True, key=f"batch_bias_{key}")
+    with col_hist:
+        # Histogramme observé et loi binomiale B(256, 1/2) attendue
+        distances = np.arange(257)
+        expected = [summary['hamming_pairs'] * math.comb(256, k) / 2 ** 256 for k in distances]
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=distances, y=summary['hamming_hist'], name="Observé", marker_color='#4776e6'))
+        fig.add_trace(go.Scatter(x=distances, y=expected, name="Binomiale", line=dict(color='#ff6b6b')))
+        fig.update_layout(
+            title=f"Distances de Hamming ({summary['hamming_pairs']} paires)",
+            xaxis_title="Bits différents",
+            xaxis_range=[80, 176],
+            height=400
+        )
+        st.plotly_chart(fig, use_container_width=True, key=f"batch_hist_{key}")
+
+with tab6:
+    st.header("Analyse d'un lot de messages")
+    st.markdown("Chaque ligne du fichier est hachée séparément ; les statistiques sont mises à jour au fur et à mesure.")
+
+    batch_file = st.file_uploader("Fichier (une ligne = un message)", type=None, key="batch_file")
+    col1, col2 = st.columns(2)
+    with col1:
+        cpu_count = os.cpu_count() or 1
+        workers = st.number_input("Processus", min_value=1, max_value=cpu_count, value=min(4, cpu_count), key="batch_workers")
+    with col2:
+        prefix_bits = st.slider("Bits de préfixe pour les collisions", min_value=8, max_value=64, value=24, key="batch_prefix")
+
+    if st.button("📦 Analyser", type="primary"):
+        if batch_file is None:
+            st.warning("Chargez d'abord un fichier")
+        else:
+            # Les lignes vides sont des messages valides (hash de la chaîne vide)
+            lines = batch_file.getvalue().splitlines()
+            if not lines:
+                st.warning("Le fichier ne contient aucune ligne")
+            else:
+                try:
+                    stats = BatchStats(prefix_bits=prefix_bits)
+                    progress = st.progress(0.0)
+                    placeholder = st.empty()
+                    done = 0
+                    renders = 0
+                    last_render = 0.0
+                    for digests in hash_batch(lines, workers=int(workers)):
+                        stats.update(digests)
+                        done += len(digests)
+                        progress.progress(done / len(lines))
+                        # Limiter le rendu des graphiques à ~2 par seconde
+                        if time.perf_counter() - last_render > 0.5:
+                            last_render = time.perf_counter()
+                            renders += 1
+                            with placeholder.container():
+                                render_batch_summary(stats.summary(), renders)
+                    placeholder.empty()
+                    st.session_state.batch_summary = stats.summary()
+                    st.success(f"{done} lignes analysées")
+                except Exception as e:
+                    st.error(f"Erreur lors de l'analyse: {str(e)}")
+
+    if st.session_state.batch_summary:
+        render_batch_summary(st.session_state.batch_summary, "final")
+
+
+# ===== MÉTRIQUES DE SESSION =====
+# Calculées en fin de script : la latence affichée est celle du rerun courant
+st.session_state.rerun_ms = (time.perf_counter() - rerun_start) * 1000
+with st.sidebar:
+    with st.expander("📈 Métriques", expanded=False):
+        session_bytes = sum(deep_sizeof(v) for v in st.session_state.to_dict().values())
+        st.metric("Mémoire session", f"{session_bytes / 1024:.1f} Ko")
+        st.metric("Latence du rerun", f"{st.session_state.rerun_ms:.1f} ms")
+        st.metric("Traces partagées", f"{len(store)} ({store.nbytes() / 1024 / 1024:.1f} Mo)")
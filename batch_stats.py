@@ -0,0 +1,142 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from sha256 import sha256
+
+DIGEST_BYTES = 32
+DIGEST_BITS = 256
+
+# Découpe un itérable de messages en lots de taille fixe
+def _chunks(messages: Iterable[bytes], size: int) -> Iterator[List[bytes]]:
+    chunk = []
+    for m in messages:
+        chunk.append(m)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Hachage d'un lot : renvoie les digests concaténés (32 octets chacun)
+def _hash_chunk(chunk: List[bytes]) -> bytes:
+    return b"".join(sha256(m) for m in chunk)
+
+def hash_batch(messages: Iterable[bytes], workers: int = 1, chunk_size: int = 512) -> Iterator[np.ndarray]:
+    """Hache les messages par lots et renvoie, dans l'ordre, un tableau (n, 32) uint8 par lot.
+
+    Avec workers > 1 les lots sont répartis sur un pool de processus ; les
+    résultats arrivent au fil de l'eau pour que les statistiques avancent.
+    Si le générateur est abandonné (rerun Streamlit), les lots en attente sont
+    annulés au lieu d'être hachés jusqu'au bout.
+    """
+    chunks = _chunks(messages, chunk_size)
+    if workers <= 1:
+        results = map(_hash_chunk, chunks)
+        for raw in results:
+            yield np.frombuffer(raw, dtype=np.uint8).reshape(-1, DIGEST_BYTES)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for raw in pool.map(_hash_chunk, chunks):
+            yield np.frombuffer(raw, dtype=np.uint8).reshape(-1, DIGEST_BYTES)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# Distances de Hamming entre toutes les paires (x_i, y_j) : |x| + |y| - 2 <x, y>
+# Calcul en float32 (produit matriciel BLAS) : exact pour des vecteurs 0/1 de 256 bits
+def _hamming(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    dist = x.sum(axis=1)[:, None] + y.sum(axis=1)[None, :] - 2 * (x @ y.T)
+    return dist.astype(np.int64)
+
+class BatchStats:
+    """Statistiques incrémentales sur un flux de digests SHA-256.
+
+    - biais par bit : fréquence des 1 pour chacun des 256 bits
+    - histogramme des distances de Hamming : chaque nouveau digest est comparé
+      à un échantillon de référence (les `max_reference` premiers digests),
+      ce qui évite le coût quadratique sur de gros fichiers
+    - collisions sur les `prefix_bits` premiers bits, en nombre de paires de
+      digests distincts (les lignes identiques sont comptées à part comme doublons)
+    """
+
+    def __init__(self, prefix_bits: int = 24, max_reference: int = 1024):
+        if not 1 <= prefix_bits <= 64:
+            raise ValueError("prefix_bits doit être compris entre 1 et 64")
+        self.prefix_bits = prefix_bits
+        self.max_reference = max_reference
+        self.count = 0
+        self.ones = np.zeros(DIGEST_BITS, dtype=np.int64)
+        self.hamming_hist = np.zeros(DIGEST_BITS + 1, dtype=np.int64)
+        self.duplicates = 0
+        self.prefix_collisions = 0
+        self._reference = np.empty((0, DIGEST_BITS), dtype=np.float32)
+        self._digests: set = set()
+        self._prefix_counts: Dict[int, int] = {}
+
+    def update(self, digests: np.ndarray) -> None:
+        bits = np.unpackbits(digests, axis=1)
+        self.count += len(digests)
+        self.ones += bits.sum(axis=0, dtype=np.int64)
+        self._update_hamming(bits)
+        self._update_collisions(digests)
+
+    def _update_hamming(self, bits: np.ndarray) -> None:
+        new = bits.astype(np.float32)
+        room = self.max_reference - len(self._reference)
+        if room > 0:
+            # Les premiers digests du lot rejoignent la référence ; paires internes comptées une seule fois
+            admitted = new[:room]
+            if len(self._reference):
+                self._add_distances(_hamming(admitted, self._reference))
+            self._add_distances(_hamming(admitted, admitted)[np.triu_indices(len(admitted), k=1)])
+            self._reference = np.vstack([self._reference, admitted])
+            new = new[room:]
+        if len(new):
+            self._add_distances(_hamming(new, self._reference))
+
+    def _add_distances(self, dist: np.ndarray) -> None:
+        self.hamming_hist += np.bincount(dist.ravel(), minlength=DIGEST_BITS + 1)
+
+    def _update_collisions(self, digests: np.ndarray) -> None:
+        prefixes = digests[:, :8].copy().view(">u8").ravel() >> np.uint64(64 - self.prefix_bits)
+        for raw, prefix in zip(digests, prefixes.tolist()):
+            key = raw.tobytes()
+            if key in self._digests:
+                self.duplicates += 1
+                continue
+            self._digests.add(key)
+            # Le nouveau digest forme une paire avec chaque digest déjà vu de même préfixe
+            seen = self._prefix_counts.get(prefix, 0)
+            self.prefix_collisions += seen
+            self._prefix_counts[prefix] = seen + 1
+
+    def bit_bias(self) -> np.ndarray:
+        # Écart à 0.5 de la fréquence des 1 pour chaque bit
+        if self.count == 0:
+            return np.zeros(DIGEST_BITS)
+        return self.ones / self.count - 0.5
+
+    def expected_collisions(self) -> float:
+        # Paradoxe des anniversaires : n(n-1)/2 paires, probabilité 2^-k chacune
+        n = len(self._digests)
+        return n * (n - 1) / 2 / 2 ** self.prefix_bits
+
+    def summary(self) -> Dict:
+        bias = self.bit_bias()
+        pairs = int(self.hamming_hist.sum())
+        mean = float((self.hamming_hist * np.arange(DIGEST_BITS + 1)).sum() / pairs) if pairs else 0.0
+        return {
+            "count": self.count,
+            "bit_bias": bias,
+            "max_abs_bias": float(np.abs(bias).max()),
+            "hamming_hist": self.hamming_hist.copy(),
+            "hamming_pairs": pairs,
+            "hamming_mean": mean,
+            "prefix_bits": self.prefix_bits,
+            "prefix_collisions": self.prefix_collisions,
+            "expected_collisions": self.expected_collisions(),
+            "duplicates": self.duplicates,
+        }
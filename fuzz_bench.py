@@ -0,0 +1,129 @@
+from __future__ import annotations
+import argparse
+import gc
+import hashlib
+import json
+import os
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from sha256 import ENGINES
+
+# Longueurs autour des frontières de bloc (55/56 : le champ longueur déborde, 64 : bloc plein)
+BOUNDARY_LENGTHS: List[int] = [0, 1, 55, 56, 57, 63, 64, 65, 111, 112, 119, 120, 127, 128, 129]
+DEFAULT_BASELINE = "bench_baseline.json"
+
+def boundary_inputs() -> List[bytes]:
+    out = []
+    for n in BOUNDARY_LENGTHS:
+        out.append(b"\x00" * n)
+        out.append(b"\xff" * n)
+        out.append(bytes(i & 0xFF for i in range(n)))
+    return out
+
+def random_inputs(rng: random.Random, count: int, max_len: int) -> List[bytes]:
+    return [rng.randbytes(rng.randint(0, max_len)) for _ in range(count)]
+
+# Comparaison différentielle avec hashlib
+def check_equivalence(inputs: List[bytes]) -> List[str]:
+    failures = []
+    for data in inputs:
+        expected = hashlib.sha256(data).digest()
+        for name, engine in ENGINES.items():
+            got = engine(data)
+            if got != expected:
+                failures.append(f"{name}: len={len(data)} data={data[:16].hex()}... got {got.hex()} expected {expected.hex()}")
+    return failures
+
+# Débit en Ko/s par moteur : médiane de `repeat` mesures, chacune enchaînant
+# des appels pendant `budget` secondes. Les moteurs sont mesurés en alternance
+# et sans ramasse-miettes (comme timeit) pour lisser le bruit de la machine.
+def measure_throughput(size: int, repeat: int, budget: float = 0.5) -> Dict[str, float]:
+    data = bytes(i & 0xFF for i in range(size))
+    samples: Dict[str, List[float]] = {name: [] for name in ENGINES}
+    for engine in ENGINES.values():
+        engine(data)  # échauffement
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for name, engine in ENGINES.items():
+                calls = 0
+                start = time.perf_counter()
+                while True:
+                    engine(data)
+                    calls += 1
+                    elapsed = time.perf_counter() - start
+                    if elapsed >= budget:
+                        break
+                samples[name].append(calls * size / 1024 / elapsed)
+            gc.collect()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+def check_regressions(current: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    regressions = []
+    for name, kbps in current.items():
+        ref = baseline.get(name)
+        if ref is None:
+            print(f"ATTENTION {name}: absent de la baseline, non vérifié (relancer avec --update-baseline)")
+            continue
+        drop = (ref - kbps) / ref * 100
+        if drop > tolerance:
+            regressions.append(f"{name}: {kbps:.1f} Ko/s vs {ref:.1f} Ko/s (-{drop:.1f}% > {tolerance:.1f}%)")
+    return regressions
+
+def run(seed: int = 0, count: int = 200, max_len: int = 300, size: int = 16384, repeat: int = 5,
+        budget: float = 0.5, baseline_path: str = DEFAULT_BASELINE, tolerance: float = 20.0,
+        update: bool = False) -> bool:
+    rng = random.Random(seed)
+    inputs = boundary_inputs() + random_inputs(rng, count, max_len)
+    # Une entrée multi-blocs plus grande
+    inputs.append(rng.randbytes(size))
+
+    failures = check_equivalence(inputs)
+    for f in failures:
+        print("FAIL", f)
+    print(f"{len(inputs)} entrées x {len(ENGINES)} moteurs :", "OK" if not failures else f"{len(failures)} échecs")
+
+    current = measure_throughput(size, repeat, budget)
+    for name, kbps in current.items():
+        print(f"{name:<16} {kbps:10.1f} Ko/s")
+
+    ok = not failures
+    if update:
+        with open(baseline_path, "w") as fh:
+            json.dump(current, fh, indent=2, sort_keys=True)
+        print("Baseline écrite dans", baseline_path)
+    elif not os.path.exists(baseline_path):
+        # Sans baseline, la vérification des régressions ne peut pas échouer : c'est une erreur
+        print(f"ERREUR baseline {baseline_path} introuvable (la créer avec --update-baseline)")
+        ok = False
+    else:
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)
+        regressions = check_regressions(current, baseline, tolerance)
+        for r in regressions:
+            print("REGRESSION", r)
+        ok &= not regressions
+    return ok
+
+if __name__ == "__main__":
+    import sys
+    parser = argparse.ArgumentParser(description="Fuzz différentiel contre hashlib et suivi du débit par moteur")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=200, help="nombre d'entrées aléatoires")
+    parser.add_argument("--max-len", type=int, default=300, help="longueur max des entrées aléatoires")
+    parser.add_argument("--size", type=int, default=16384, help="taille de l'entrée de benchmark (octets)")
+    parser.add_argument("--repeat", type=int, default=5, help="nombre de mesures (on garde la médiane)")
+    parser.add_argument("--budget", type=float, default=0.5, help="durée de chaque mesure (secondes)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=20.0, help="régression tolérée en %%")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.seed, args.count, args.max_len, args.size, args.repeat, args.budget,
+                      args.baseline, args.tolerance, args.update_baseline) else 1)
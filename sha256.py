@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import Callable, List, Tuple, Dict
 from utils import to_uint32, rotr, shr
 
 # Constants (FIPS 180-4)
@@ -142,3 +142,9 @@ def sha256_trace(data: bytes) -> Dict:
         "blocks": trace_blocks,
         "digest": digest
     }
+
+# Moteurs disponibles (nom -> fonction bytes -> digest brut), vérifiés par fuzz_bench.py
+ENGINES: Dict[str, Callable[[bytes], bytes]] = {
+    "sha256": sha256,
+    "sha256_trace": lambda data: bytes.fromhex(sha256_trace(data)["digest"]),
+}
@@ -0,0 +1,57 @@
+import hashlib
+import random
+
+import numpy as np
+
+from batch_stats import BatchStats, hash_batch
+
+def _brute_hamming(digests: np.ndarray, max_reference: int) -> np.ndarray:
+    bits = np.unpackbits(digests, axis=1).astype(np.int32)
+    ref = bits[:max_reference]
+    hist = np.zeros(257, dtype=np.int64)
+    for i in range(len(ref)):
+        hist += np.bincount((ref[i + 1:] != ref[i]).sum(axis=1), minlength=257)
+    for x in bits[max_reference:]:
+        hist += np.bincount((ref != x).sum(axis=1), minlength=257)
+    return hist
+
+def _brute_collisions(messages, prefix_bits: int):
+    distinct = {hashlib.sha256(m).digest() for m in messages}
+    counts = {}
+    for d in distinct:
+        prefix = int.from_bytes(d[:8], "big") >> (64 - prefix_bits)
+        counts[prefix] = counts.get(prefix, 0) + 1
+    pairs = sum(c * (c - 1) // 2 for c in counts.values())
+    return pairs, len(messages) - len(distinct)
+
+def run():
+    rng = random.Random(0)
+    messages = [b""] + [rng.randbytes(rng.randint(0, 80)) for _ in range(1500)] + [b"abc", b"abc", b""]
+    ok = True
+
+    for workers in (1, 2):
+        chunks = list(hash_batch(messages, workers=workers, chunk_size=128))
+        digests = np.vstack(chunks)
+        hashes_ok = [d.tobytes() for d in digests] == [hashlib.sha256(m).digest() for m in messages]
+        print(f"hash_batch workers={workers}", "OK" if hashes_ok else "FAIL")
+        ok &= hashes_ok
+
+    for prefix_bits, max_reference in ((8, 300), (16, 2000)):
+        stats = BatchStats(prefix_bits=prefix_bits, max_reference=max_reference)
+        for chunk in hash_batch(messages, chunk_size=128):
+            stats.update(chunk)
+        summary = stats.summary()
+
+        hamming_ok = np.array_equal(summary["hamming_hist"], _brute_hamming(digests, max_reference))
+        print(f"hamming reference={max_reference}", "OK" if hamming_ok else "FAIL")
+        ok &= hamming_ok
+
+        pairs, duplicates = _brute_collisions(messages, prefix_bits)
+        collisions_ok = summary["prefix_collisions"] == pairs and summary["duplicates"] == duplicates
+        print(f"collisions {prefix_bits} bits", summary["prefix_collisions"], "paires", "OK" if collisions_ok else "FAIL")
+        ok &= collisions_ok
+    return ok
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(0 if run() else 1)
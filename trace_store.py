@@ -0,0 +1,104 @@
+from __future__ import annotations
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sha256 import sha256_trace
+
+REGISTERS = "abcdefgh"
+# Variables et opérations formatées en hex pour chaque round (en plus des registres)
+ROUND_FIELDS = ("T1", "T2", "K", "W", "Ch", "Maj", "Sigma0", "Sigma1")
+
+# Pré-calcul des chaînes affichées pour chaque round : l'autoplay n'a plus rien à formater.
+# Les rounds bruts ne servent plus ensuite : ils sont retirés de la trace pour libérer la mémoire,
+# et le schedule de chaque bloc reçoit sa version hexadécimale (`schedule_hex`).
+def build_frames(trace: Dict) -> List[List[Dict[str, str]]]:
+    frames = []
+    for block in trace["blocks"]:
+        block_frames = []
+        for r in block.pop("rounds"):
+            frame = {reg: f"0x{r[reg]:08x}" for reg in REGISTERS}
+            frame.update({name: f"0x{r[name]:08x}" for name in ROUND_FIELDS})
+            frame["hash"] = "".join(f"{r[reg]:08x}" for reg in REGISTERS)
+            block_frames.append(frame)
+        block["schedule_hex"] = [f"0x{w:08x}" for w in block["schedule"]]
+        frames.append(block_frames)
+    return frames
+
+class TraceStore:
+    """Cache LRU partagé entre les sessions : digest -> (trace, frames).
+
+    Chaque session ne garde que le digest ; la trace complète n'existe qu'une
+    fois en mémoire, quel que soit le nombre d'utilisateurs qui la consultent.
+    L'éviction se fait sur le nombre d'entrées et sur la taille totale
+    (`max_bytes`) ; la dernière trace insérée est toujours conservée.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, Dict] = OrderedDict()
+        self._by_message: Dict[bytes, str] = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes) -> Tuple[str, Dict, List[List[Dict[str, str]]]]:
+        """Calcule (ou retrouve) la trace du message et renvoie (digest, trace, frames)."""
+        with self._lock:
+            digest = self._by_message.get(data)
+            entry = self._entries.get(digest) if digest is not None else None
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return digest, entry["trace"], entry["frames"]
+        # Calcul (et mesure de la taille) hors verrou : les autres sessions ne sont pas bloquées
+        trace = sha256_trace(data)
+        entry = {"trace": trace, "frames": build_frames(trace), "message": data}
+        entry["nbytes"] = deep_sizeof(entry)
+        digest = trace["digest"]
+        with self._lock:
+            if digest not in self._entries:
+                # Une autre session a pu insérer la même trace entre-temps : on garde la première
+                self._entries[digest] = entry
+                self._by_message[data] = digest
+                self._nbytes += entry["nbytes"]
+            self._entries.move_to_end(digest)
+            entry = self._entries[digest]
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._nbytes > self.max_bytes):
+                _, old = self._entries.popitem(last=False)
+                self._by_message.pop(old["message"], None)
+                self._nbytes -= old["nbytes"]
+            # Renvoyé depuis la même section verrouillée : pas de relecture exposée à une éviction
+            return digest, entry["trace"], entry["frames"]
+
+    def get(self, digest: Optional[str]) -> Optional[Tuple[Dict, List[List[Dict[str, str]]]]]:
+        """Renvoie (trace, frames) en une seule lecture, ou None si la trace a été évincée."""
+        if digest is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self._entries.move_to_end(digest)
+            return entry["trace"], entry["frames"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def nbytes(self) -> int:
+        # Total tenu à jour par put() et l'éviction : aucun parcours à chaque rerun
+        return self._nbytes
+
+# Taille mémoire approximative d'un objet et de son contenu (octets)
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(x, seen) for x in obj)
+    return size